@@ -1,4 +1,13 @@
 from labelord.cli import cli, main
-from labelord.web import app
 
 __all__ = ['cli', 'main', 'app']
+
+
+def __getattr__(name):
+    # Flask app is imported lazily, CLI commands don't need it
+    if name == 'app':
+        from labelord.web import app
+        return app
+    raise AttributeError(
+        'module {!r} has no attribute {!r}'.format(__name__, name)
+    )
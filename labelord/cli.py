@@ -1,13 +1,13 @@
 import click
-import requests
+import functools
 import sys
 
-from labelord.web import app
 from labelord.consts import NO_GH_TOKEN_RETURN, GH_ERROR_RETURN, \
     DEFAULT_ERROR_RETURN
 from labelord.github import GitHub, GitHubError
 from labelord.printing import VerbosePrinter, QuietPrinter, Printer
-from labelord.run_logic import DryRunProcessor, RunProcessor
+from labelord.run_logic import DryRunProcessor, GraphQLRunProcessor, \
+    RunProcessor
 from labelord.helpers import create_config, extract_repos, extract_labels
 
 
@@ -30,8 +30,10 @@ def pick_printer(verbose, quiet):
     return Printer
 
 
-def pick_runner(dry_run):
-    return DryRunProcessor if dry_run else RunProcessor
+def pick_runner(dry_run, graphql):
+    if dry_run:
+        return DryRunProcessor
+    return GraphQLRunProcessor if graphql else RunProcessor
 
 
 @click.group(name='labelord')
@@ -44,11 +46,8 @@ def pick_runner(dry_run):
 @click.pass_context
 def cli(ctx, config, token):
     ctx.obj['config'] = create_config(config, token)
-    ctx.obj['config'].optionxform = str
-    if token is not None:
-        ctx.obj['config'].read_dict({'github': {'token': token}})
     if ctx.obj['config'].has_option('github', 'token'):
-        session = ctx.obj.get('session', requests.Session())
+        session = ctx.obj.get('session', None)
         ctx.obj['GitHub'] = GitHub(
             ctx.obj['config'].get('github', 'token'),
             session
@@ -60,8 +59,8 @@ def cli(ctx, config, token):
 def list_repos(ctx):
     github = retrieve_github_client(ctx)
     try:
-        repos = github.list_repositories()
-        click.echo('\n'.join(repos))
+        for repo in github.list_repositories():
+            click.echo(repo)
     except GitHubError as error:
         click.echo(error, err=True)
         sys.exit(gh_error_return(error))
@@ -94,8 +93,13 @@ def list_labels(ctx, repository):
               help='No output at all.')
 @click.option('--all-repos', '-a', is_flag=True,
               help='Run for all repositories available.')
+@click.option('--graphql', '-g', is_flag=True,
+              help='Use batched GitHub GraphQL requests.')
+@click.option('--skip-identical', '-s', is_flag=True,
+              help='Do not update labels differing only in color case.')
 @click.pass_context
-def run(ctx, mode, template_repo, dry_run, verbose, quiet, all_repos):
+def run(ctx, mode, template_repo, dry_run, verbose, quiet, all_repos,
+        graphql, skip_identical):
     github = retrieve_github_client(ctx)
     labels = extract_labels(
         github, template_repo,
@@ -106,9 +110,12 @@ def run(ctx, mode, template_repo, dry_run, verbose, quiet, all_repos):
     else:
         repos = extract_repos(ctx.obj['config'])
     printer = pick_printer(verbose, quiet)()
-    processor = pick_runner(dry_run)(github, printer)
+    processor = pick_runner(dry_run, graphql)(github, printer)
     try:
-        return_code = processor.run(repos, labels, processor.MODES[mode])
+        run_mode = processor.MODES[mode]
+        if skip_identical:
+            run_mode = functools.partial(run_mode, ignore_color_case=True)
+        return_code = processor.run(repos, labels, run_mode)
         sys.exit(return_code)
     except GitHubError as error:
         click.echo(error, err=True)
@@ -124,8 +131,10 @@ def run(ctx, mode, template_repo, dry_run, verbose, quiet, all_repos):
               help='Turns on DEBUG mode.')
 @click.pass_context
 def run_server(ctx, host, port, debug):
+    from labelord.web import app
     app.labelord_config = ctx.obj['config']
     app.github = retrieve_github_client(ctx)
+    app.finish_setup()
     app.run(host=host, port=port, debug=debug)
 
 
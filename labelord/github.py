@@ -1,13 +1,19 @@
 import hashlib
 import hmac
-import requests
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
 
 
 class GitHubError(Exception):
 
     def __init__(self, response):
         self.status_code = response.status_code
-        self.message = response.json().get('message', 'No message provided')
+        try:
+            data = response.json()
+            self.message = data.get('message', 'No message provided')
+        except ValueError:
+            self.message = response.text[:200] or 'No message provided'
 
     def __str__(self):
         return 'GitHub: ERROR {}'.format(self.code_message)
@@ -17,59 +23,299 @@ class GitHubError(Exception):
         return sep.join([str(self.status_code), self.message])
 
 
+class GitHubGraphQLError(GitHubError):
+    ERROR_CODES = {
+        'FORBIDDEN': 403,
+        'NOT_FOUND': 404,
+    }
+
+    def __init__(self, error):
+        self.status_code = self.ERROR_CODES.get(error.get('type'), 422)
+        self.message = error.get('message', 'No message provided')
+
+
 class GitHub:
     GH_API_ENDPOINT = 'https://api.github.com'
+    GH_GRAPHQL_ENDPOINT = 'https://api.github.com/graphql'
+    GRAPHQL_BATCH = 20
+    GRAPHQL_MUTATIONS_BATCH = 50
+    GRAPHQL_LABELS_PREVIEW = 'application/vnd.github.bane-preview+json'
+    GRAPHQL_REPO_FIELDS = 'id labels(first: 100) { ' \
+                          'nodes { id name color } pageInfo { hasNextPage } }'
+    POOL_SIZE = 32
+    RETRIES = 3
+    PAGE_WORKERS = 8
+    RATE_LIMIT_MAX_WAIT = 60
 
     def __init__(self, token, session=None):
-        self.token = token
+        self._token = token
+        self._cache = {}
+        self._pages_executor = ThreadPoolExecutor(
+            max_workers=self.PAGE_WORKERS
+        )
         self.set_session(session)
 
+    @property
+    def token(self):
+        return self._token
+
+    @token.setter
+    def token(self, token):
+        self._token = token
+        self.session.headers['Authorization'] = 'token ' + token
+
     def set_session(self, session):
-        self.session = session or requests.Session()
-        self.session.auth = self._session_auth()
-
-    def _session_auth(self):
-        def github_auth(req):
-            req.headers = {
-                'Authorization': 'token ' + self.token,
-                'User-Agent': 'Python/Labelord'
-            }
-            return req
-        return github_auth
-
-    def _get_raising(self, url, expected_code=200):
-        response = self.session.get(url)
-        if response.status_code != expected_code:
+        if session is None:
+            import requests
+            session = requests.Session()
+            session.mount('https://', self._create_adapter())
+        self.session = session
+        self.session.headers.update({
+            'Authorization': 'token ' + self.token,
+            'User-Agent': 'Python/Labelord',
+            'Accept': 'application/vnd.github.v3+json',
+            'Accept-Encoding': 'gzip',
+        })
+
+    @classmethod
+    def _create_adapter(cls):
+        """Adapter keeping alive enough connections for concurrent use"""
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+        retry = Retry(total=cls.RETRIES, backoff_factor=0.5,
+                      status_forcelist=[502, 503, 504],
+                      raise_on_status=False)
+        return HTTPAdapter(pool_connections=cls.POOL_SIZE,
+                           pool_maxsize=cls.POOL_SIZE, max_retries=retry)
+
+    def _rate_limit_wait(self, response):
+        """Get seconds to wait for rate limit reset (None if not waiting)"""
+        if response.status_code not in (403, 429) or \
+                response.headers.get('X-RateLimit-Remaining', None) != '0':
+            return None
+        reset = int(response.headers.get('X-RateLimit-Reset', 0))
+        wait = max(reset - time.time(), 0) + 1
+        return wait if wait <= self.RATE_LIMIT_MAX_WAIT else None
+
+    def _get_raising(self, url, expected_code=200, headers=None):
+        response = self.session.get(url, headers=headers)
+        wait = self._rate_limit_wait(response)
+        if wait is not None:
+            time.sleep(wait)
+            response = self.session.get(url, headers=headers)
+        if response.status_code not in (expected_code, 304):
             raise GitHubError(response)
         return response
 
-    def _get_all_data(self, resource):
-        """Get all data spread across multiple pages"""
-        response = self._get_raising('{}{}?per_page=100&page=1'.format(
+    @staticmethod
+    def _conditional_headers(response):
+        """Get headers for conditional request based on validators"""
+        if 'ETag' in response.headers:
+            return {'If-None-Match': response.headers['ETag']}
+        if 'Last-Modified' in response.headers:
+            return {'If-Modified-Since': response.headers['Last-Modified']}
+        return None
+
+    def _get_json(self, url, fields):
+        """Get JSON items of URL projected to fields and links of URL"""
+        cached = self._cache.get(url, None)
+        headers = None if cached is None else cached[0]
+        response = self._get_raising(url, headers=headers)
+        if response.status_code == 304 and cached is not None:
+            return cached[1], cached[2]
+        data = [tuple(item[f] for f in fields) for item in response.json()]
+        conditional_headers = self._conditional_headers(response)
+        if conditional_headers is not None:
+            self._cache[url] = (conditional_headers, data, response.links)
+        return data, response.links
+
+    def _get_all_data(self, resource, fields):
+        """Get all data spread across multiple pages as fields tuples"""
+        data, links = self._get_json('{}{}?per_page=100&page=1'.format(
             self.GH_API_ENDPOINT, resource
-        ))
-        yield from response.json()
-        while 'next' in response.links:
-            response = self._get_raising(response.links['next']['url'])
-            yield from response.json()
+        ), fields)
+        yield from data
+        if 'last' in links:
+            urls = self._following_pages_urls(links['last']['url'])
+            pages = self._pages_executor.map(
+                lambda url: self._get_json(url, fields), urls
+            )
+            for data, _ in pages:
+                yield from data
+            return
+        while 'next' in links:
+            data, links = self._get_json(links['next']['url'], fields)
+            yield from data
+
+    @staticmethod
+    def _following_pages_urls(last_url):
+        """Get URLs of pages from the second to the last one"""
+        parts = urllib.parse.urlsplit(last_url)
+        query = urllib.parse.parse_qs(parts.query)
+        for page in range(2, int(query['page'][0]) + 1):
+            query['page'] = [str(page)]
+            yield urllib.parse.urlunsplit(parts._replace(
+                query=urllib.parse.urlencode(query, doseq=True)
+            ))
 
     def list_repositories(self):
-        """Get list of names of accessible repositories (including owner)"""
-        data = self._get_all_data('/user/repos')
-        return [repo['full_name'] for repo in data]
+        """Get names of accessible repositories (including owner) lazily"""
+        data = self._get_all_data('/user/repos', ('full_name',))
+        return (full_name for full_name, in data)
 
     def list_labels(self, repository):
         """Get dict of labels with colors for given repository slug"""
-        data = self._get_all_data('/repos/{}/labels'.format(repository))
-        return {l['name']: str(l['color']) for l in data}
+        data = self._get_all_data('/repos/{}/labels'.format(repository),
+                                  ('name', 'color'))
+        return {name: str(color) for name, color in data}
+
+    def graphql(self, query, variables=None, headers=None):
+        """Run GraphQL query and get whole response payload"""
+        response = self.session.post(
+            self.GH_GRAPHQL_ENDPOINT,
+            json={'query': query, 'variables': variables or {}},
+            headers=headers
+        )
+        if response.status_code != 200:
+            raise GitHubError(response)
+        payload = response.json()
+        if payload.get('data') is None:
+            raise GitHubGraphQLError((payload.get('errors') or [{}])[0])
+        return payload
+
+    @staticmethod
+    def _graphql_errors(payload):
+        """Get GraphQL errors of payload by top-level alias"""
+        return {e['path'][0]: GitHubGraphQLError(e)
+                for e in payload.get('errors', []) if e.get('path')}
+
+    def query_repositories(self, repositories):
+        """Get repository nodes with labels (or GitHubErrors) via GraphQL"""
+        result, valid = {}, []
+        for repository in repositories:
+            owner, _, name = repository.partition('/')
+            if owner and name:
+                valid.append(repository)
+            else:
+                result[repository] = GitHubGraphQLError({
+                    'type': 'NOT_FOUND',
+                    'message': 'Could not resolve to a Repository '
+                               'with the name \'{}\'.'.format(repository)
+                })
+        for i in range(0, len(valid), self.GRAPHQL_BATCH):
+            result.update(self._query_repositories(
+                valid[i:i + self.GRAPHQL_BATCH]
+            ))
+        return result
+
+    def _query_repositories(self, repositories):
+        """Get repository nodes (or errors) using one aliased query"""
+        params, fields, variables = [], [], {}
+        for i, repository in enumerate(repositories):
+            owner, name = repository.split('/', 1)
+            params.append('$o{0}: String!, $n{0}: String!'.format(i))
+            fields.append('r{0}: repository(owner: $o{0}, name: $n{0}) '
+                          '{{ {1} }}'.format(i, self.GRAPHQL_REPO_FIELDS))
+            variables['o{}'.format(i)] = owner
+            variables['n{}'.format(i)] = name
+        payload = self.graphql('query({}) {{ {} }}'.format(
+            ', '.join(params), ' '.join(fields)
+        ), variables)
+        errors = self._graphql_errors(payload)
+        data = payload['data']
+        result = {}
+        for i, repository in enumerate(repositories):
+            alias = 'r{}'.format(i)
+            if data.get(alias) is None:
+                result[repository] = errors.get(alias, GitHubGraphQLError({}))
+            else:
+                result[repository] = data[alias]
+        return result
+
+    def list_labels_batch(self, repositories):
+        """Get dicts of labels for multiple repositories (or GitHubErrors)
+
+        Repositories are queried in batches via GraphQL, those having more
+        labels than fits into one GraphQL page are listed using REST.
+        """
+        result = {}
+        for repository, node in self.query_repositories(repositories).items():
+            if isinstance(node, GitHubError):
+                result[repository] = node
+            elif node['labels']['pageInfo']['hasNextPage']:
+                result[repository] = self.list_labels(repository)
+            else:
+                result[repository] = {
+                    label['name']: str(label['color'])
+                    for label in node['labels']['nodes']
+                }
+        return result
+
+    def list_labels_graphql(self, repository):
+        """Get dict of labels with colors for given repository via GraphQL"""
+        labels = self.list_labels_batch([repository])[repository]
+        if isinstance(labels, GitHubError):
+            raise labels
+        return labels
+
+    def batch_label_mutations(self, repository_id, creates=(), updates=(),
+                              deletes=()):
+        """Create, update and delete labels using batched GraphQL requests
+
+        Creates are (name, color) pairs, updates are (label_id, name, color)
+        triples and deletes are label ids. Returns list of GitHubErrors (or
+        None for successful mutation) in order creates, updates, deletes.
+        """
+        mutations = \
+            [('createLabel', 'CreateLabelInput',
+              {'repositoryId': repository_id, 'name': n, 'color': c})
+             for n, c in creates] + \
+            [('updateLabel', 'UpdateLabelInput',
+              {'id': i, 'name': n, 'color': c}) for i, n, c in updates] + \
+            [('deleteLabel', 'DeleteLabelInput', {'id': i}) for i in deletes]
+        results = []
+        for i in range(0, len(mutations), self.GRAPHQL_MUTATIONS_BATCH):
+            batch = mutations[i:i + self.GRAPHQL_MUTATIONS_BATCH]
+            try:
+                results.extend(self._mutate(batch))
+            except GitHubError as error:
+                results.extend([error] * len(batch))
+        return results
+
+    def _mutate(self, mutations):
+        """Run aliased mutations in one request, get their errors"""
+        params, fields, variables = [], [], {}
+        for i, (mutation, input_type, data) in enumerate(mutations):
+            params.append('$i{}: {}!'.format(i, input_type))
+            fields.append('m{0}: {1}(input: $i{0}) {{ clientMutationId }}'
+                          .format(i, mutation))
+            variables['i{}'.format(i)] = data
+        payload = self.graphql('mutation({}) {{ {} }}'.format(
+            ', '.join(params), ' '.join(fields)
+        ), variables, headers={'Accept': self.GRAPHQL_LABELS_PREVIEW})
+        errors = self._graphql_errors(payload)
+        results = []
+        for i in range(len(mutations)):
+            alias = 'm{}'.format(i)
+            if payload['data'].get(alias) is None:
+                results.append(errors.get(alias, GitHubGraphQLError({})))
+            else:
+                results.append(None)
+        return results
+
+    def _labels_url(self, repository):
+        """Get URL of labels of given repository"""
+        return '{}/repos/{}/labels'.format(self.GH_API_ENDPOINT, repository)
+
+    def _label_url(self, repository, name):
+        """Get URL of label with URL-encoded name in given repository"""
+        return '{}/{}'.format(self._labels_url(repository),
+                              urllib.parse.quote(name, safe=''))
 
     def create_label(self, repository, name, color, **kwargs):
         """Create new label in given repository"""
         data = {'name': name, 'color': color}
-        response = self.session.post(
-            '{}/repos/{}/labels'.format(self.GH_API_ENDPOINT, repository),
-            json=data
-        )
+        response = self.session.post(self._labels_url(repository), json=data)
         if response.status_code != 201:
             raise GitHubError(response)
 
@@ -77,9 +323,7 @@ class GitHub:
         """Update existing label in given repository"""
         data = {'name': name, 'color': color}
         response = self.session.patch(
-            '{}/repos/{}/labels/{}'.format(
-                self.GH_API_ENDPOINT, repository, old_name or name
-            ),
+            self._label_url(repository, old_name or name),
             json=data
         )
         if response.status_code != 200:
@@ -87,15 +331,31 @@ class GitHub:
 
     def delete_label(self, repository, name, **kwargs):
         """Delete existing label in given repository"""
-        response = self.session.delete(
-             '{}/repos/{}/labels/{}'.format(
-                 self.GH_API_ENDPOINT, repository, name
-             )
-        )
+        response = self.session.delete(self._label_url(repository, name))
         if response.status_code != 204:
             raise GitHubError(response)
 
     @staticmethod
-    def webhook_verify_signature(data, signature, secret, encoding='utf-8'):
-        h = hmac.new(secret.encode(encoding), data, hashlib.sha1)
-        return hmac.compare_digest('sha1=' + h.hexdigest(), signature)
+    def webhook_hmac(secret):
+        """Create keyed HMAC for verifying webhooks with encoded secret"""
+        return hmac.new(secret, digestmod=hashlib.sha1)
+
+    @staticmethod
+    def webhook_verify_signature(data, signature, secret):
+        """Verify 'sha1=<hex>' signature of data using encoded secret
+
+        Secret can be also keyed HMAC from webhook_hmac which is then just
+        copied instead of processing the key again for every webhook.
+        """
+        if not signature.startswith('sha1='):
+            return False
+        try:
+            provided = bytes.fromhex(signature[5:])
+        except ValueError:
+            return False
+        if isinstance(secret, bytes):
+            mac = GitHub.webhook_hmac(secret)
+        else:
+            mac = secret.copy()
+        mac.update(data)
+        return hmac.compare_digest(mac.digest(), provided)
@@ -1,5 +1,3 @@
-import configparser
-import os
 import sys
 import click
 
@@ -8,13 +6,16 @@ from labelord.consts import DEFAULT_CONFIG_FILE, NO_LABELS_SPEC_RETURN, \
 
 
 def create_config(config_filename=None, token=None):
+    import configparser
     cfg = configparser.ConfigParser()
     cfg.optionxform = str
     cfg_filename = config_filename or DEFAULT_CONFIG_FILE
 
-    if os.access(cfg_filename, os.R_OK):
+    try:
         with open(cfg_filename) as f:
             cfg.read_file(f)
+    except (FileNotFoundError, PermissionError):
+        pass
     if token is not None:
         cfg.read_dict({'github': {'token': token}})
     return cfg
@@ -33,7 +34,8 @@ def extract_labels(gh, template_opt, cfg):
 
 def extract_repos(cfg):
     if cfg.has_section('repos'):
-        repos = cfg['repos'].keys()
-        return [r for r in repos if cfg['repos'].getboolean(r, False)]
+        states = cfg.BOOLEAN_STATES
+        return [r for r, v in cfg['repos'].items()
+                if states.get(v.strip().lower(), False)]
     click.echo('No repositories specification has been found', err=True)
     sys.exit(NO_REPOS_SPEC_RETURN)
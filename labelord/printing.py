@@ -1,4 +1,5 @@
 import click
+import threading
 
 
 class BasePrinter:
@@ -15,15 +16,22 @@ class BasePrinter:
     RESULT_DRY = 'DRY'
 
     def __init__(self):
-        self.repos = set()
+        self.repos_count = 0
         self.errors = 0
+        self.lock = threading.Lock()
 
     def add_repo(self, slug):
-        self.repos.add(slug)
+        with self.lock:
+            self.repos_count += 1
 
     def event(self, event, result, repo, *args):
-        if result == self.RESULT_ERROR:
-            self.errors += 1
+        with self.lock:
+            if result == self.RESULT_ERROR:
+                self.errors += 1
+            self._echo_event(event, result, repo, *args)
+
+    def _echo_event(self, event, result, repo, *args):
+        pass
 
     def summary(self):
         pass
@@ -31,16 +39,14 @@ class BasePrinter:
     def _create_summary(self):
         if self.errors > 0:
             return self.ERROR_SUMMARY.format(self.errors)
-        return self.SUCCESS_SUMMARY.format(len(self.repos))
+        return self.SUCCESS_SUMMARY.format(self.repos_count)
 
 
 class Printer(BasePrinter):
 
-    def event(self, event, result, repo, *args):
-        super().event(event, result, repo, *args)
+    def _echo_event(self, event, result, repo, *args):
         if result == self.RESULT_ERROR:
-            line_parts = ['ERROR: ' + event, repo, *args]
-            click.echo('; '.join(line_parts))
+            click.echo('; '.join(('ERROR: ' + event, repo) + args))
 
     def summary(self):
         click.echo('SUMMARY: ' + self._create_summary())
@@ -54,10 +60,9 @@ class VerbosePrinter(BasePrinter):
 
     LINE_START = '[{}][{}] {}'
 
-    def event(self, event, result, repo, *args):
-        super().event(event, result, repo, *args)
-        line_parts = [self.LINE_START.format(event, result, repo), *args]
-        click.echo('; '.join(line_parts))
+    def _echo_event(self, event, result, repo, *args):
+        line_start = self.LINE_START.format(event, result, repo)
+        click.echo('; '.join((line_start,) + args))
 
     def summary(self):
         click.echo('[SUMMARY] ' + self._create_summary())
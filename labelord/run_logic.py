@@ -1,3 +1,5 @@
+from concurrent.futures import ThreadPoolExecutor
+
 from labelord.printing import Printer, QuietPrinter
 from labelord.github import GitHubError
 from labelord.consts import DEFAULT_ERROR_RETURN, DEFAULT_SUCCESS_RETURN
@@ -5,29 +7,45 @@ from labelord.consts import DEFAULT_ERROR_RETURN, DEFAULT_SUCCESS_RETURN
 class RunModes:
 
     @staticmethod
-    def _make_labels_dict(labels_spec):
+    def make_labels_dict(labels_spec):
         return {k.lower(): (k, v) for k, v in labels_spec.items()}
 
     @classmethod
-    def update_mode(cls, labels, labels_specs):
+    def update_mode(cls, labels, labels_specs, specs_lower, matched=None,
+                    ignore_color_case=False):
+        if matched is None and labels == labels_specs:
+            return dict(), dict(), dict()  # Nothing to change
         create = dict()
         update = dict()
-        xlabels = cls._make_labels_dict(labels)
-        for name, color in labels_specs.items():
-            if name.lower() not in xlabels:
+        xlabels = cls.make_labels_dict(labels)
+        for lower_name, (name, color) in specs_lower.items():
+            current = xlabels.get(lower_name, None)
+            if current is None:
                 create[name] = (name, color)
-            elif name not in labels:  # changed case of name
-                old_name = xlabels[name.lower()][0]
+                continue
+            old_name, old_color = current
+            if matched is not None:
+                matched.add(old_name)
+            if old_name != name:  # changed case of name
                 update[old_name] = (name, color)
-            elif labels[name] != color:
+            elif ignore_color_case and old_color.lower() == color.lower():
+                continue  # same color in different case
+            elif old_color != color:
                 update[name] = (name, color)
         return create, update, dict()
 
     @classmethod
-    def replace_mode(cls, labels, labels_specs):
-        create, update, delete = cls.update_mode(labels, labels_specs)
-        delete = {n: (n, c) for n, c in labels.items()
-                  if n not in labels_specs}
+    def replace_mode(cls, labels, labels_specs, specs_lower,
+                     ignore_color_case=False):
+        if labels == labels_specs:
+            return dict(), dict(), dict()  # Nothing to change
+        matched = set()
+        create, update, _ = cls.update_mode(labels, labels_specs,
+                                            specs_lower, matched,
+                                            ignore_color_case)
+        if len(matched) == len(labels):
+            return create, update, dict()  # All labels are specified
+        delete = {n: (n, c) for n, c in labels.items() if n not in matched}
         return create, update, delete
 
 
@@ -37,10 +55,13 @@ class RunProcessor:
         'update': RunModes.update_mode,
         'replace': RunModes.replace_mode
     }
+    MAX_WORKERS = 8
+    MUTATION_WORKERS = 8
 
     def __init__(self, github, printer=None):
         self.github = github
         self.printer = printer or QuietPrinter()
+        self.mutations_executor = None
 
     def _process_generic(self, slug, key, data, event, method):
         old_name, name, color = key, data[0], data[1]
@@ -65,12 +86,11 @@ class RunProcessor:
         self._process_generic(slug, key, data, Printer.EVENT_DELETE,
                               self.github.delete_label)
 
-    @staticmethod
-    def _process(slug, changes, processor):
-        for key, data in changes.items():
-            processor(slug, key, data)
+    def _process(self, slug, changes, processor):
+        return [self.mutations_executor.submit(processor, slug, key, data)
+                for key, data in changes.items()]
 
-    def _run_one(self, slug, labels_specs, mode):
+    def _run_one(self, slug, labels_specs, specs_lower, mode):
         self.printer.add_repo(slug)
         try:
             labels = self.github.list_labels(slug)
@@ -78,14 +98,28 @@ class RunProcessor:
             self.printer.event(Printer.EVENT_LABELS, Printer.RESULT_ERROR,
                                slug, error.code_message)
         else:
-            create, update, delete = mode(labels, labels_specs)
-            self._process(slug, create, self._process_create)
-            self._process(slug, update, self._process_update)
-            self._process(slug, delete, self._process_delete)
+            create, update, delete = mode(labels, labels_specs, specs_lower)
+            if not (create or update or delete):
+                return  # Labels are already as specified
+            futures = \
+                self._process(slug, create, self._process_create) + \
+                self._process(slug, update, self._process_update) + \
+                self._process(slug, delete, self._process_delete)
+            for future in futures:
+                future.result()
 
     def run(self, slugs, labels_specs, mode):
-        for slug in slugs:
-            self._run_one(slug, labels_specs, mode)
+        specs_lower = RunModes.make_labels_dict(labels_specs)
+        self.mutations_executor = ThreadPoolExecutor(
+            max_workers=self.MUTATION_WORKERS
+        )
+        with self.mutations_executor, \
+                ThreadPoolExecutor(max_workers=self.MAX_WORKERS) as executor:
+            list(executor.map(
+                lambda slug: self._run_one(slug, labels_specs,
+                                           specs_lower, mode),
+                slugs
+            ))
         self.printer.summary()
         return (DEFAULT_ERROR_RETURN if self.printer.errors > 0
                 else DEFAULT_SUCCESS_RETURN)
@@ -107,3 +141,49 @@ class DryRunProcessor(RunProcessor):
     def _process_delete(self, slug, key, data):
         self.printer.event(Printer.EVENT_DELETE, Printer.RESULT_DRY,
                            slug, data[0], data[1])
+
+
+class GraphQLRunProcessor(RunProcessor):
+
+    def __init__(self, github, printer=None):
+        super().__init__(github, printer)
+        self.repositories = {}
+
+    def _run_one(self, slug, labels_specs, specs_lower, mode):
+        node = self.repositories[slug]
+        if not isinstance(node, GitHubError) and \
+                node['labels']['pageInfo']['hasNextPage']:
+            # Labels do not fit into single GraphQL page, use REST
+            return super()._run_one(slug, labels_specs, specs_lower, mode)
+        self.printer.add_repo(slug)
+        if isinstance(node, GitHubError):
+            self.printer.event(Printer.EVENT_LABELS, Printer.RESULT_ERROR,
+                               slug, node.code_message)
+            return
+        nodes = {label['name']: label for label in node['labels']['nodes']}
+        labels = {name: str(label['color']) for name, label in nodes.items()}
+        create, update, delete = mode(labels, labels_specs, specs_lower)
+        if not (create or update or delete):
+            return  # Labels are already as specified
+        changes = \
+            [(Printer.EVENT_CREATE, data) for data in create.values()] + \
+            [(Printer.EVENT_UPDATE, data) for data in update.values()] + \
+            [(Printer.EVENT_DELETE, data) for data in delete.values()]
+        errors = self.github.batch_label_mutations(
+            node['id'], create.values(),
+            [(nodes[key]['id'], name, color)
+             for key, (name, color) in update.items()],
+            [nodes[key]['id'] for key in delete]
+        )
+        for (event, (name, color)), error in zip(changes, errors):
+            if error is None:
+                self.printer.event(event, Printer.RESULT_SUCCESS,
+                                   slug, name, color)
+            else:
+                self.printer.event(event, Printer.RESULT_ERROR,
+                                   slug, name, color, error.code_message)
+
+    def run(self, slugs, labels_specs, mode):
+        slugs = list(slugs)
+        self.repositories = self.github.query_repositories(slugs)
+        return super().run(slugs, labels_specs, mode)
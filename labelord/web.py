@@ -1,8 +1,12 @@
 import click
+import collections
 import flask
+import json
 import os
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.exceptions import default_exceptions
 
 from labelord.github import GitHub, GitHubError
 from labelord.consts import NO_GH_TOKEN_RETURN, \
@@ -10,34 +14,35 @@ from labelord.consts import NO_GH_TOKEN_RETURN, \
 from labelord.helpers import create_config, extract_repos
 
 
-class LabelordChange:
+class LabelordChange(collections.namedtuple(
+        'LabelordChange', ['action', 'name', 'color', 'new_name'])):
+    __slots__ = ()
     CHANGE_TIMEOUT = 10
 
-    def __init__(self, action, name, color, new_name=None):
-        self.action = action
-        self.name = name
-        self.color = None if action == 'deleted' else color
-        self.old_name = new_name
-        self.timestamp = int(time.time())
-
-    @property
-    def tuple(self):
-        return self.action, self.name, self.color, self.old_name
-
-    def __eq__(self, other):
-        return self.tuple == other.tuple
-
-    def is_valid(self):
-        return self.timestamp > (int(time.time()) - self.CHANGE_TIMEOUT)
+    @classmethod
+    def make(cls, action, name, color, new_name=None):
+        return cls(action, name, None if action == 'deleted' else color,
+                   new_name)
 
 
 class LabelordWeb(flask.Flask):
+    MIRROR_WORKERS = 8
+    ERROR_CODES = tuple(default_exceptions)
 
     def __init__(self, labelord_config, github, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.labelord_config = labelord_config
         self.github = github
         self.ignores = {}
+        self.webhook_secret = b''
+        self.webhook_hmac = GitHub.webhook_hmac(self.webhook_secret)
+        self._handlers_installed = False
+        self._repos_set = frozenset()
+        self._repos_tuple = ()
+        self._mirror_targets = {}
+        self._mirror_pool = ThreadPoolExecutor(
+            max_workers=self.MIRROR_WORKERS, thread_name_prefix='mirror'
+        )
 
     def inject_session(self, session):
         self.github.set_session(session)
@@ -49,11 +54,12 @@ class LabelordWeb(flask.Flask):
             config_filename=config_filename
         )
         self._check_config()
+        self._cache_config()
         self.github.token = self.labelord_config.get('github', 'token')
 
     @property
     def repos(self):
-        return extract_repos(flask.current_app.labelord_config)
+        return self._repos_tuple
 
     def _check_config(self):
         if not self.labelord_config.has_option('github', 'token'):
@@ -67,13 +73,28 @@ class LabelordWeb(flask.Flask):
             click.echo('No webhook secret has been provided', err=True)
             sys.exit(NO_WEBHOOK_SECRET_RETURN)
 
+    def _cache_config(self):
+        self.webhook_secret = self.labelord_config.get(
+            'github', 'webhook_secret'
+        ).encode('utf-8')
+        self.webhook_hmac = GitHub.webhook_hmac(self.webhook_secret)
+        self._repos_tuple = tuple(extract_repos(self.labelord_config))
+        self._repos_set = frozenset(self._repos_tuple)
+        self._mirror_targets = {
+            repo: tuple(r for r in self._repos_tuple if r != repo)
+            for repo in self._repos_tuple
+        }
+
     def _init_error_handlers(self):
-        from werkzeug.exceptions import default_exceptions
-        for code in default_exceptions:
-            self.errorhandler(code)(LabelordWeb._error_page)
+        if self._handlers_installed:
+            return
+        for code in self.ERROR_CODES:
+            self.register_error_handler(code, LabelordWeb._error_page)
+        self._handlers_installed = True
 
     def finish_setup(self):
         self._check_config()
+        self._cache_config()
         self._init_error_handlers()
 
     @staticmethod
@@ -84,65 +105,84 @@ class LabelordWeb(flask.Flask):
         )
         gh = github or GitHub('')  # dummy, but will be checked later
         gh.token = cfg.get('github', 'token', fallback='')
-        return LabelordWeb(cfg, gh, import_name=__name__)
+        app = LabelordWeb(cfg, gh, import_name=__name__)
+        app._init_error_handlers()
+        return app
 
     @staticmethod
     def _error_page(error):
         return flask.render_template('error.html', error=error), error.code
 
-    def cleanup_ignores(self):
-        for repo in self.ignores:
-            self.ignores[repo] = [c for c in self.ignores[repo]
-                                  if c.is_valid()]
+    def cleanup_ignores(self, now=None):
+        if now is None:
+            now = int(time.time())
+        cutoff = now - LabelordChange.CHANGE_TIMEOUT
+        for changes in self.ignores.values():
+            # Changes are ordered by timestamp, expired ones are at start
+            while changes and next(iter(changes.values())) <= cutoff:
+                changes.popitem(last=False)
 
-    def process_label_webhook_create(self, label, repo):
-        self.github.create_label(repo, label['name'], label['color'])
+    def process_label_webhook_create(self, repo, name, color, old_name):
+        self.github.create_label(repo, name, color)
 
-    def process_label_webhook_delete(self, label, repo):
-        self.github.delete_label(repo, label['name'])
+    def process_label_webhook_delete(self, repo, name, color, old_name):
+        self.github.delete_label(repo, name)
 
-    def process_label_webhook_edit(self, label, repo, changes):
-        name = old_name = label['name']
-        color = label['color']
-        if 'name' in changes:
-            old_name = changes['name']['from']
+    def process_label_webhook_edit(self, repo, name, color, old_name):
         self.github.update_label(repo, name, color, old_name)
 
+    ACTION_HANDLERS = {
+        'created': 'process_label_webhook_create',
+        'deleted': 'process_label_webhook_delete',
+        'edited': 'process_label_webhook_edit',
+    }
+
+    def _mirror_label(self, handler, repo, name, color, old_name):
+        try:
+            handler(repo, name, color, old_name)
+        except GitHubError:
+            pass  # Ignore GitHub errors
+
     def process_label_webhook(self, data):
-        self.cleanup_ignores()
+        repo = data['repository']['full_name']
+        targets = self._mirror_targets.get(repo, None)
+        if not targets:
+            return  # This repo is not allowed or has nowhere to mirror
         action = data['action']
+        handler_name = self.ACTION_HANDLERS.get(action, None)
+        if handler_name is None:
+            return  # Nothing to mirror for this action
+        handler = getattr(self, handler_name)
         label = data['label']
-        repo = data['repository']['full_name']
-        flask.current_app.logger.info(
+        self.logger.info(
             'Processing LABEL webhook event with action {} from {} '
             'with label {}'.format(action, repo, label)
         )
-        if repo not in self.repos:
-            return  # This repo is not being allowed in this app
+        now = int(time.time())
+        self.cleanup_ignores(now)
 
-        change = LabelordChange(action, label['name'], label['color'])
-        if action == 'edited' and 'name' in data['changes']:
-            change.new_name = label['name']
-            change.name = data['changes']['name']['from']
+        name, color = label['name'], label['color']
+        old_name = name
+        changes = data.get('changes') or {}
+        if action == 'edited' and 'name' in changes:
+            old_name = changes['name']['from']
+            change = LabelordChange.make(action, old_name, color, name)
+        else:
+            change = LabelordChange.make(action, name, color)
 
-        if repo in self.ignores and change in self.ignores[repo]:
-            self.ignores[repo].remove(change)
+        ignored = self.ignores.get(repo, {})
+        if change in ignored:
+            del ignored[change]
             return  # This change was initiated by this service
-        for r in self.repos:
-            if r == repo:
-                continue
-            if r not in self.ignores:
-                self.ignores[r] = []
-            self.ignores[r].append(change)
-            try:
-                if action == 'created':
-                    self.process_label_webhook_create(label, r)
-                elif action == 'deleted':
-                    self.process_label_webhook_delete(label, r)
-                elif action == 'edited':
-                    self.process_label_webhook_edit(label, r, data['changes'])
-            except GitHubError:
-                pass  # Ignore GitHub errors
+        for r in targets:
+            ignored = self.ignores.setdefault(r, collections.OrderedDict())
+            ignored[change] = now
+            ignored.move_to_end(change)
+        futures = [self._mirror_pool.submit(self._mirror_label, handler,
+                                            r, name, color, old_name)
+                   for r in targets]
+        for future in futures:
+            future.result()
 
 
 app = LabelordWeb.create_app()
@@ -161,23 +201,28 @@ def index():
 
 @app.route('/', methods=['POST'])
 def hook_accept():
-    headers = flask.request.headers
+    current_app = flask.current_app._get_current_object()
+    request = flask.request._get_current_object()
+    headers = request.headers
     signature = headers.get('X-Hub-Signature', '')
     event = headers.get('X-GitHub-Event', '')
-    data = flask.request.get_json()
+    raw = request.get_data(cache=False)
 
-    if not flask.current_app.github.webhook_verify_signature(
-            flask.request.data, signature,
-            flask.current_app.labelord_config.get('github', 'webhook_secret')
+    if not current_app.github.webhook_verify_signature(
+            raw, signature, current_app.webhook_hmac
     ):
         flask.abort(401)
 
     if event == 'label':
-        if data['repository']['full_name'] not in flask.current_app.repos:
+        try:
+            data = json.loads(raw.decode('utf-8'))
+        except ValueError:
+            flask.abort(400, 'Invalid JSON payload')
+        if data['repository']['full_name'] not in current_app._repos_set:
             flask.abort(400, 'Repository is not allowed in application')
-        flask.current_app.process_label_webhook(data)
+        current_app.process_label_webhook(data)
         return ''
     if event == 'ping':
-        flask.current_app.logger.info('Accepting PING webhook event')
+        current_app.logger.info('Accepting PING webhook event')
         return ''
     flask.abort(400, 'Event not supported')
@@ -1,6 +1,8 @@
 import configparser
+import functools
 import json
 import os
+import shlex
 import subprocess
 import sys
 
@@ -50,6 +52,12 @@ class GitHubMatcher(betamax.BaseMatcher):
         # GitHub requires User-Agent, requests should do it automatically
         return request.headers.get('User-Agent', None) is not None
 
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def _parse_json(string):
+        # Same bodies are matched against many recorded interactions
+        return json.loads(string)
+
     @staticmethod
     def _match_body_json(request, recorded_request):
         if request.body is None:
@@ -59,8 +67,8 @@ class GitHubMatcher(betamax.BaseMatcher):
             # Recorded body is empty but tested is not
             return False
 
-        data1 = json.loads(recorded_request['body']['string'])
-        data2 = json.loads(decode_if_bytes(request.body))
+        data1 = GitHubMatcher._parse_json(recorded_request['body']['string'])
+        data2 = GitHubMatcher._parse_json(decode_if_bytes(request.body))
         # Compare JSON data from bodies
         return data1 == data2
 
@@ -119,22 +127,28 @@ class Utils:
     BETAMAX_ERRORS = 0
 
     @staticmethod
+    @functools.lru_cache(maxsize=None)
     def config(name):
         return CONFIGS_PATH + '/' + name + '.cfg'
 
     @staticmethod
+    @functools.lru_cache(maxsize=None)
     def load_data(name):
         with open(DATA_PATH + '/' + name + '.json') as f:
             return f.read()
 
     @staticmethod
-    def create_auth(username, password):
+    @functools.lru_cache(maxsize=32)
+    def _basic_auth(username, password):
         import base64
-        return {
-            'Authorization': 'Basic ' + base64.b64encode(
-                bytes(username + ":" + password, 'ascii')
-            ).decode('ascii')
-        }
+        return 'Basic ' + base64.b64encode(
+            bytes(username + ":" + password, 'ascii')
+        ).decode('ascii')
+
+    @staticmethod
+    def create_auth(username, password):
+        # Fresh dict so callers can modify headers without touching cache
+        return {'Authorization': Utils._basic_auth(username, password)}
 
     @classmethod
     def monkeypatch_betamaxerror(cls, monkeypatch):
@@ -257,15 +271,14 @@ def config():
 @pytest.fixture()
 def sh():
     def shell_executor(command, *args):
-        p = subprocess.Popen(
-            ' '.join([command, *args]),
+        # Commands from config may contain arguments, no shell is needed
+        cp = subprocess.run(
+            shlex.split(' '.join([command, *args])),
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
-            shell=True,
             universal_newlines=True
         )
-        stdout, stderr = p.communicate()
-        return ShellExecutionResult(stdout, stderr, p.returncode)
+        return ShellExecutionResult(cp.stdout, cp.stderr, cp.returncode)
     return shell_executor
 
 
@@ -0,0 +1,49 @@
+# All tests here use this:
+# repo1 = [(label1, FFAA00), (label3, 00FF33), (label4, 771077)]
+# repo2 = [(label2, CCAAFF)]
+
+
+def test_update_graphql(invoker, utils):
+    # POST: 3 (query: 1, repo1: 1, repo2: 1)
+    invocation = invoker('--config', utils.config('config_normal'),
+                         'run', 'update', '--graphql', '--verbose',
+                         session_expectations={
+                             'get': 0,
+                             'post': 3,
+                             'patch': 0,
+                             'delete': 0
+                         })
+    lines = invocation.result.output.split('\n')
+
+    assert invocation.result.exit_code == 0
+    assert len(lines) == 6 and lines[-1] == ''
+    assert '[ADD][SUC] MarekSuchanek/repo1; label2; CCAAFF' in lines
+    assert '[UPD][SUC] MarekSuchanek/repo1; label3; 00FF00' in lines
+    assert '[ADD][SUC] MarekSuchanek/repo2; label1; FFAA00' in lines
+    assert '[ADD][SUC] MarekSuchanek/repo2; label3; 00FF00' in lines
+    assert lines[-2] == '[SUMMARY] 2 repo(s) updated successfully'
+
+
+def test_replace_graphql_with_errors(invoker, utils):
+    # POST: 3 (query: 1, repo1: 1, repo2: 1)
+    invocation = invoker('--config', utils.config('config_errors'),
+                         'run', 'replace', '-g', '-v',
+                         session_expectations={
+                             'get': 0,
+                             'post': 3,
+                             'patch': 0,
+                             'delete': 0
+                         })
+    lines = invocation.result.output.split('\n')
+
+    assert invocation.result.exit_code == 10
+    assert len(lines) == 10 and lines[-1] == ''
+    assert '[ADD][SUC] MarekSuchanek/repo1; label2; CCAAFF' in lines
+    assert '[ADD][ERR] MarekSuchanek/repo1; label7; 00FFCCAA; 422 - Validation Failed' in lines
+    assert '[UPD][ERR] MarekSuchanek/repo1; label3; 00FFXX; 422 - Validation Failed' in lines
+    assert '[DEL][SUC] MarekSuchanek/repo1; label4; 771077' in lines
+    assert '[ADD][SUC] MarekSuchanek/repo2; label1; FFAA00' in lines
+    assert '[ADD][ERR] MarekSuchanek/repo2; label3; 00FFXX; 422 - Validation Failed' in lines
+    assert '[ADD][ERR] MarekSuchanek/repo2; label7; 00FFCCAA; 422 - Validation Failed' in lines
+    assert '[LBL][ERR] MarekSuchanek/repo7; 404 - Not Found' in lines
+    assert lines[-2] == '[SUMMARY] 5 error(s) in total, please check log above'
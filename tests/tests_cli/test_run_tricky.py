@@ -24,6 +24,24 @@ def test_color_case_sensitivity(invoker, utils):
     assert lines[-2] == '[SUMMARY] 1 repo(s) updated successfully'
 
 
+def test_color_case_skip_identical(invoker, utils):
+    # repo4 contains label0 with color eEeEeE which
+    # is the same color as EEEEEE from the config
+    invocation = invoker('-c', utils.config('config_color'),
+                         'run', 'update', '--verbose', '--skip-identical',
+                         session_expectations={
+                             'get': 1,
+                             'post': 0,
+                             'patch': 0,
+                             'delete': 0
+                         })
+    lines = invocation.result.output.split('\n')
+
+    assert invocation.result.exit_code == 0
+    assert len(lines) == 2 and lines[-1] == ''
+    assert lines[0] == '[SUMMARY] 1 repo(s) updated successfully'
+
+
 def test_label_case_sensitivity(invoker, utils):
     # Label names are case insensitive, so if
     # there is same name with different case in
@@ -1,12 +1,17 @@
+import http.server
 import pytest
+import requests
+import threading
+import time
 from labelord.github import GitHub, GitHubError
 
 LABELORD_REPO = 'MarekSuchanek/labelord'
 UNEXISTING_REPO = 'MarekSuchanek/adsw51dwa1d5123aa'
+DUMMY_TOKEN = 'thisIsNotRealToken'
 
 
 def test_list_repositories(github):
-    repositories = github.list_repositories()
+    repositories = list(github.list_repositories())
 
     assert len(repositories) == 49
     assert LABELORD_REPO in repositories
@@ -14,7 +19,7 @@ def test_list_repositories(github):
 
 def test_list_repositories_with_bad_token(github_bad_token):
     with pytest.raises(GitHubError) as err:
-        github_bad_token.list_repositories()
+        list(github_bad_token.list_repositories())
 
     assert err.value.status_code == 401
     assert err.value.message == 'Bad credentials'
@@ -43,6 +48,66 @@ def test_list_labels_with_bad_token(github_bad_token):
     assert err.value.message == 'Bad credentials'
 
 
+def test_list_labels_not_modified(github, monkeypatch):
+    sent = []
+    get = github.session.get
+
+    def spy_get(url, headers=None, **kwargs):
+        response = get(url, headers=headers, **kwargs)
+        sent.append((headers, response.status_code))
+        return response
+
+    monkeypatch.setattr(github.session, 'get', spy_get)
+    labels = github.list_labels(LABELORD_REPO)
+    # Second request is conditional and GitHub responds 304 Not Modified
+    cached_labels = github.list_labels(LABELORD_REPO)
+
+    assert labels == cached_labels
+    assert labels == {'bug': 'ee0701', 'wontfix': 'ffffff'}
+    assert sent == [
+        (None, 200),
+        ({'If-None-Match': '"27b25aa5f00dcf9b4837b9e731f8e2e9"'}, 304),
+    ]
+
+
+def test_list_labels_graphql_from_existing_repo(github):
+    labels = github.list_labels_graphql(LABELORD_REPO)
+
+    assert len(labels) == 3
+    assert labels['bug'] == 'ee0701'
+
+
+def test_list_labels_graphql_from_unexisting_repo(github):
+    with pytest.raises(GitHubError) as err:
+        github.list_labels_graphql(UNEXISTING_REPO)
+
+    assert err.value.status_code == 404
+
+
+def test_following_pages_urls():
+    urls = GitHub._following_pages_urls(
+        'https://api.github.com/user/repos?per_page=100&page=4'
+    )
+
+    assert list(urls) == [
+        'https://api.github.com/user/repos?per_page=100&page=2',
+        'https://api.github.com/user/repos?per_page=100&page=3',
+        'https://api.github.com/user/repos?per_page=100&page=4',
+    ]
+
+
+@pytest.mark.parametrize(
+    ('name', 'quoted'),
+    [('bug', 'bug'), ('Testing 2', 'Testing%202'), ('a/b#?', 'a%2Fb%23%3F')]
+)
+def test_label_url(name, quoted):
+    github = GitHub(DUMMY_TOKEN, session=SessionStub([]))
+    expected = 'https://api.github.com/repos/{}/labels/{}'.format(
+        LABELORD_REPO, quoted
+    )
+    assert github._label_url(LABELORD_REPO, name) == expected
+
+
 def test_create_label_for_existing_repo(github):
     # Just matching with betamax
     github.create_label(LABELORD_REPO, 'Testing', 'aaaaaa')
@@ -140,6 +205,108 @@ def test_error_properties(github):
     assert str(err.value) == 'GitHub: ERROR 404 - Not Found'
 
 
+def make_response(status_code, content, headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = content.encode('utf-8')
+    response.headers.update(headers or {})
+    return response
+
+
+def test_error_without_json_body():
+    error = GitHubError(make_response(502, '<html>Bad Gateway</html>'))
+
+    assert error.status_code == 502
+    assert error.message == '<html>Bad Gateway</html>'
+
+
+class SessionStub:
+    def __init__(self, responses):
+        self.headers = {}
+        self.responses = responses
+        self.requests = []
+
+    def get(self, url, headers=None):
+        self.requests.append((url, headers))
+        return self.responses.pop(0)
+
+
+def test_list_labels_not_modified_since():
+    last_modified = 'Fri, 17 Nov 2017 15:19:34 GMT'
+    session = SessionStub([
+        make_response(200, '[{"name": "bug", "color": "ee0701"}]',
+                      {'Last-Modified': last_modified}),
+        make_response(304, ''),
+    ])
+    github = GitHub(DUMMY_TOKEN, session=session)
+
+    assert github.list_labels(LABELORD_REPO) == {'bug': 'ee0701'}
+    assert github.list_labels(LABELORD_REPO) == {'bug': 'ee0701'}
+    assert session.requests[1][1] == {'If-Modified-Since': last_modified}
+
+
+def test_list_labels_batch_malformed_slug():
+    session = SessionStub([])
+    github = GitHub(DUMMY_TOKEN, session=session)
+    labels = github.list_labels_batch(['labelord'])
+
+    assert isinstance(labels['labelord'], GitHubError)
+    assert labels['labelord'].status_code == 404
+    assert session.requests == []
+
+
+def test_rate_limit_wait(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(time, 'sleep', sleeps.append)
+    reset = str(int(time.time()) + 10)
+    github = GitHub(DUMMY_TOKEN, session=SessionStub([
+        make_response(403, '{"message": "API rate limit exceeded"}', {
+            'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': reset
+        }),
+        make_response(200, '[{"name": "bug", "color": "ee0701"}]'),
+    ]))
+
+    assert github.list_labels(LABELORD_REPO) == {'bug': 'ee0701'}
+    assert len(sleeps) == 1 and 10 <= sleeps[0] <= 11
+
+
+class BadGatewayHandler(http.server.BaseHTTPRequestHandler):
+    requests = 0
+
+    def _bad_gateway(self):
+        BadGatewayHandler.requests += 1
+        self.send_response(502)
+        self.send_header('Content-Length', '11')
+        self.end_headers()
+        self.wfile.write(b'Bad Gateway')
+
+    do_GET = do_POST = _bad_gateway
+
+    def log_message(self, *args):
+        pass
+
+
+def test_persistent_bad_gateway(monkeypatch):
+    monkeypatch.setattr(time, 'sleep', lambda seconds: None)
+    server = http.server.HTTPServer(('127.0.0.1', 0), BadGatewayHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    session = requests.Session()
+    session.mount('http://', GitHub._create_adapter())
+    github = GitHub(DUMMY_TOKEN, session=session)
+    github.GH_API_ENDPOINT = 'http://127.0.0.1:{}'.format(server.server_port)
+    BadGatewayHandler.requests = 0
+    try:
+        with pytest.raises(GitHubError) as err:
+            github.list_labels(LABELORD_REPO)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert err.value.status_code == 502
+    assert err.value.message == 'Bad Gateway'
+    assert BadGatewayHandler.requests == GitHub.RETRIES + 1
+
+
 @pytest.mark.parametrize(
     ('data', 'signature', 'secret', 'encoding'),
     [
@@ -160,6 +327,26 @@ def test_error_properties(github):
     ]
 )
 def test_verify_webhook_signature_correct(data, signature, secret, encoding):
-    assert GitHub.webhook_verify_signature(data, signature, secret, encoding)
+    assert GitHub.webhook_verify_signature(data, signature,
+                                           secret.encode(encoding))
+    keyed = GitHub.webhook_hmac(secret.encode(encoding))
+    assert GitHub.webhook_verify_signature(data, signature, keyed)
+    # Keyed HMAC is not consumed by verification
+    assert GitHub.webhook_verify_signature(data, signature, keyed)
+
+
+@pytest.mark.parametrize(
+    'signature',
+    [
+        '',
+        'sha1=',
+        'sha1=xyz',
+        'md5=ff00f668ad2b48568d5c72c01bd9b3b3c12032d6',
+        'sha1=ff00f668ad2b48568d5c72c01bd9b3b3c12032d7',
+    ]
+)
+def test_verify_webhook_signature_incorrect(signature):
+    data = '{"data": "thisData"}'.encode('utf-8')
+    assert not GitHub.webhook_verify_signature(data, signature, b'key1')
 
 # TODO: test multipage repos/labels
@@ -0,0 +1,47 @@
+import pytest
+from labelord.run_logic import RunModes
+
+
+def modes_args(labels, labels_specs):
+    return labels, labels_specs, RunModes.make_labels_dict(labels_specs)
+
+
+def test_update_mode():
+    labels = {'bug': 'ee0701', 'Question': 'cc317c', 'wontfix': 'ffffff'}
+    specs = {'bug': 'ff0000', 'question': 'cc317c', 'new': 'aaaaaa'}
+    create, update, delete = RunModes.update_mode(*modes_args(labels, specs))
+
+    assert create == {'new': ('new', 'aaaaaa')}
+    assert update == {'bug': ('bug', 'ff0000'),
+                      'Question': ('question', 'cc317c')}
+    assert delete == {}
+
+
+def test_replace_mode():
+    labels = {'bug': 'ee0701', 'Question': 'cc317c', 'wontfix': 'ffffff'}
+    specs = {'bug': 'ee0701', 'question': 'cc317c'}
+    create, update, delete = RunModes.replace_mode(*modes_args(labels, specs))
+
+    assert create == {}
+    # Label with changed case is renamed, not deleted
+    assert update == {'Question': ('question', 'cc317c')}
+    assert delete == {'wontfix': ('wontfix', 'ffffff')}
+
+
+@pytest.mark.parametrize('mode', [RunModes.update_mode, RunModes.replace_mode])
+def test_mode_without_changes(mode):
+    specs = {'bug': 'ff0000', 'Docs': '00ff00'}
+
+    assert mode(*modes_args(dict(specs), specs)) == ({}, {}, {})
+
+
+@pytest.mark.parametrize('mode', [RunModes.update_mode, RunModes.replace_mode])
+def test_mode_ignore_color_case(mode):
+    labels = {'bug': 'EE0701', 'Question': 'cC317c'}
+    specs = {'bug': 'ee0701', 'Question': 'CC317C'}
+
+    assert mode(*modes_args(labels, specs)) == (
+        {}, {'bug': ('bug', 'ee0701'), 'Question': ('Question', 'CC317C')}, {}
+    )
+    assert mode(*modes_args(labels, specs),
+                ignore_color_case=True) == ({}, {}, {})
@@ -0,0 +1,55 @@
+import collections
+import time
+
+from labelord.web import LabelordChange, LabelordWeb
+
+TIMEOUT = LabelordChange.CHANGE_TIMEOUT
+
+
+class GitHubStub:
+    def create_label(self, repository, name, color):
+        pass
+
+
+def make_app():
+    app = LabelordWeb(None, GitHubStub(), import_name='labelord.web')
+    app._mirror_targets = {'owner/source': ('owner/target',)}
+    return app
+
+
+def created_webhook(name):
+    return {
+        'action': 'created',
+        'label': {'name': name, 'color': 'ff0000'},
+        'repository': {'full_name': 'owner/source'},
+    }
+
+
+def test_cleanup_ignores():
+    app = make_app()
+    expired = LabelordChange.make('created', 'old', 'ff0000')
+    live = LabelordChange.make('created', 'new', 'ff0000')
+    app.ignores['owner/target'] = collections.OrderedDict([
+        (expired, 100), (live, 105)
+    ])
+    app.cleanup_ignores(100 + TIMEOUT)
+
+    assert list(app.ignores['owner/target']) == [live]
+
+
+def test_reregistered_change_moves_to_back(monkeypatch):
+    app = make_app()
+    now = [1000]
+    monkeypatch.setattr(time, 'time', lambda: now[0])
+    for timestamp, name in [(1000, 'first'), (1005, 'second'),
+                            (1008, 'first')]:
+        now[0] = timestamp
+        app.process_label_webhook(created_webhook(name))
+    first = LabelordChange.make('created', 'first', 'ff0000')
+    second = LabelordChange.make('created', 'second', 'ff0000')
+
+    assert list(app.ignores['owner/target'].items()) == \
+        [(second, 1005), (first, 1008)]
+
+    app.cleanup_ignores(1005 + TIMEOUT)
+    assert list(app.ignores['owner/target'].items()) == [(first, 1008)]
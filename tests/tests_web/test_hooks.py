@@ -142,6 +142,31 @@ def test_bad_signature(client_maker, utils):
     assert result.status == '401 UNAUTHORIZED'
 
 
+def test_malformed_payload(client_maker):
+    # Test if app refuses correctly signed webhook with malformed JSON
+    import hashlib
+    import hmac
+    client = client_maker('config_basic_web', session_expectations={
+        'get': 0, 'post': 0, 'delete': 0, 'patch': 0
+    })
+    data = b'{"action": "created", "label": '
+    signature = hmac.new(b'S3cret!', data, hashlib.sha1).hexdigest()
+    result = client.post(
+        '/',
+        data=data,
+        headers={
+            'Content-Type': 'application/json',
+            'User-Agent': 'GitHub-Hookshot/e9907f9',
+            'X-Hub-Signature': 'sha1=' + signature,
+            'X-GitHub-Event': 'label',
+            'X-Github-Delivery': 'bf64f0d0-a536-11e7-8d70-e656edf279e1',
+            'X-Request-Id': '55eedbbd-6794-4273-9438-af5a69cb24c1'
+        }
+    )
+    assert result.status == '400 BAD REQUEST'
+    assert 'Invalid JSON payload' in result.data.decode('utf-8')
+
+
 def test_no_redundant(client_maker, utils):
     import time
     client = client_maker('config_3repos_web', session_expectations={